@@ -1,8 +1,16 @@
+import json
+import os
+import re
 import sys
+from collections import OrderedDict, defaultdict
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+try:
+    import pyarrow
+except ImportError:  # pyarrow is optional; the CSV is read with the C engine
+    pyarrow = None
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLineEdit, QPushButton, QListWidget, 
                              QLabel, QMessageBox, QListWidgetItem)
@@ -10,57 +18,130 @@ from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont, QPalette, QColor
 
 
+# Number of recommendations shown for each query
+TOP_N = 20
+
+# Size of the hashed feature space used to vectorize movie features. Large
+# enough that few tokens collide; unused columns are pruned after hashing.
+HASH_FEATURES = 2 ** 22
+
+# Tokens must appear in at least this many movies to be kept, and at most
+# this many of the most common tokens are kept
+MIN_DOC_FREQ = 2
+MAX_FEATURES = 20000
+
+# Dataset location, the columns read from it, and the files used to cache
+# the processed data
+DATASET_PATH = "movie_dataset.csv"
+DATASET_COLUMNS = ['title', 'keywords', 'cast', 'genres', 'director']
+CACHE_MATRIX_PATH = "movie_cache.npz"
+CACHE_TITLES_PATH = "movie_titles.npy"
+CACHE_META_PATH = "movie_cache.json"
+# Bump whenever the processing pipeline changes so stale caches are rebuilt
+CACHE_VERSION = 5
+
+# Maximum number of queries whose recommendations are kept in memory
+REC_CACHE_SIZE = 128
+
+
+def similarity_row(count_matrix, movie_index):
+    """
+    Compute the cosine similarity of one movie against all movies.
+    Rows of the count matrix are L2-normalized, so this is a dot product.
+    """
+    # Sparse matrix times a dense vector runs scipy's compiled CSR matvec and
+    # writes straight into a dense float32 result
+    query = count_matrix[movie_index].toarray().ravel()
+    return count_matrix @ query
+
+
 class RecommendationWorker(QThread):
     """
     Worker thread to perform movie recommendation calculations in the background.
     This prevents the GUI from freezing during computation.
     """
-    finished = pyqtSignal(list, str)  # Signal to emit results or error message
+    finished = pyqtSignal(list, list, str)  # Signal to emit results, display text or error message
     error = pyqtSignal(str)  # Signal to emit error messages
     
-    def __init__(self, movie_title, df, cosine_sim):
+    def __init__(self, movie_title, titles, titles_lower, count_matrix, title_index,
+                 token_index):
         super().__init__()
         self.movie_title = movie_title
-        self.df = df
-        self.cosine_sim = cosine_sim
+        self.titles = titles
+        self.titles_lower = titles_lower
+        self.count_matrix = count_matrix
+        self.title_index = title_index
+        self.token_index = token_index
+        self._cancelled = False
+    
+    def cancel(self):
+        """Ask the worker to stop; its results will not be emitted."""
+        self._cancelled = True
+    
+    def is_cancelled(self):
+        """Return True if cancel() has been called."""
+        return self._cancelled
+    
+    def find_partial_match(self, query):
+        """
+        Find the row of the shortest title containing the query.
+        Whole-word queries are answered from the token index; anything it
+        cannot resolve falls back to a substring scan over all titles.
+        """
+        tokens = re.findall(r'\w+', query)
+        postings = [self.token_index.get(token) for token in tokens]
+        
+        matches = []
+        if postings and all(postings):
+            # Titles containing every query word, checked for the exact substring
+            candidates = set(postings[0]).intersection(*postings[1:])
+            matches = [i for i in candidates if query in self.titles_lower[i]]
+        
+        if not matches:
+            matches = np.flatnonzero(np.char.find(self.titles_lower, query) >= 0).tolist()
+        
+        if not matches:
+            return None
+        
+        return min(matches, key=lambda i: (len(self.titles[i]), i))
     
     def run(self):
         """Execute the recommendation algorithm in the background thread."""
         try:
             # Get index of the movie from its title
-            movie_matches = self.df[self.df['title'].str.lower() == self.movie_title.lower()]
+            movie_index = self.title_index.get(self.movie_title.lower())
             
-            if movie_matches.empty:
+            if movie_index is None:
                 # Try case-insensitive partial match
-                movie_matches = self.df[self.df['title'].str.lower().str.contains(
-                    self.movie_title.lower(), na=False)]
+                movie_index = self.find_partial_match(self.movie_title.lower())
             
-            if movie_matches.empty:
+            if movie_index is None:
                 self.error.emit(f"Movie '{self.movie_title}' not found in the database.")
                 return
             
-            # Get the first match
-            movie_index = movie_matches.index[0]
-            
             # Get similarity scores for this movie
-            similar_movies = list(enumerate(self.cosine_sim[movie_index]))
+            row = similarity_row(self.count_matrix, movie_index)
             
-            # Sort by similarity score in descending order
-            sorted_similar_movies = sorted(similar_movies, key=lambda x: x[1], reverse=True)
+            if self._cancelled:
+                return
+            
+            # Partially sort to pull out the top 21 candidates (the movie itself
+            # is usually among them), then order just those by score
+            k = min(TOP_N + 1, len(row))
+            idx = np.argpartition(row, -k)[-k:]
+            idx = idx[np.argsort(-row[idx])]
             
             # Get top 20 recommendations (excluding the movie itself)
-            recommendations = []
-            count = 0
-            for movie in sorted_similar_movies:
-                if movie[0] != movie_index:  # Exclude the movie itself
-                    movie_title = self.df.iloc[movie[0]]['title']
-                    similarity_score = movie[1]
-                    recommendations.append((movie_title, similarity_score))
-                    count += 1
-                    if count >= 20:
-                        break
+            idx = idx[idx != movie_index][:TOP_N]
+            titles = self.titles[idx]
+            scores = row[idx]
+            recommendations = list(zip(titles.tolist(), scores.tolist()))
             
-            self.finished.emit(recommendations, None)
+            # Format display text here so the GUI thread only has to insert it
+            formatted = [f"{rank}. {title} (Similarity: {score * 100:.1f}%)"
+                         for rank, (title, score) in enumerate(recommendations, 1)]
+            
+            self.finished.emit(recommendations, formatted, None)
             
         except Exception as e:
             self.error.emit(f"An error occurred: {str(e)}")
@@ -77,8 +158,18 @@ class MovieRecommenderGUI(QMainWindow):
         
         # Initialize data structures
         self.df = None
-        self.cosine_sim = None
+        self.titles_arr = None
+        self.titles_lower = None
+        self.count_matrix = None
+        self.title_index = None
+        self.token_index = None
         self.worker = None
+        # Cancelled workers kept alive until their threads finish
+        self._stale_workers = []
+        
+        # LRU cache of recommendations keyed by lower-cased query title
+        self._rec_cache = OrderedDict()
+        self._pending_key = None
         
         # Load and process data
         self.load_and_process_data()
@@ -88,39 +179,31 @@ class MovieRecommenderGUI(QMainWindow):
     
     def load_and_process_data(self):
         """
-        Load the movie dataset and compute cosine similarity matrix.
-        This is done once at startup for efficiency.
+        Load the movie dataset and build the normalized TF-IDF matrix.
+        This is done once at startup; similarities are computed per query.
+        Processed data is cached on disk and reused while the CSV is unchanged.
         """
         try:
-            # Step 1: Read the CSV file
-            self.df = pd.read_csv("movie_dataset.csv")
+            csv_mtime = os.path.getmtime(DATASET_PATH)
             
-            # Step 2: Select features for recommendation
-            features = ['keywords', 'cast', 'genres', 'director']
+            if not self.load_cached_data(csv_mtime):
+                self.process_dataset()
+                self.save_cached_data(csv_mtime)
             
-            # Step 3: Fill NaN values and create combined features column
-            for feature in features:
-                self.df[feature] = self.df[feature].fillna('')
+            # Plain array of titles so workers avoid DataFrame indexing overhead
+            self.titles_arr = self.df['title'].fillna('').astype(str).to_numpy(dtype=object)
+            # Lower-cased titles as a fixed-width string array for vectorized search
+            self.titles_lower = np.char.lower(self.titles_arr.astype(str))
             
-            def combine_features(row):
-                """Combine all selected features into a single string."""
-                try:
-                    return (str(row['keywords']) + " " + 
-                           str(row['cast']) + " " + 
-                           str(row['genres']) + " " + 
-                           str(row['director']))
-                except Exception as e:
-                    print(f"Error combining features: {e}")
-                    return ""
-            
-            self.df["combined_features"] = self.df.apply(combine_features, axis=1)
-            
-            # Step 4: Create count matrix from combined features
-            cv = CountVectorizer()
-            count_matrix = cv.fit_transform(self.df['combined_features'])
-            
-            # Step 5: Compute cosine similarity matrix
-            self.cosine_sim = cosine_similarity(count_matrix)
+            # Map lower-cased titles to row positions for O(1) exact lookups,
+            # keeping the first row when a title appears more than once
+            self.title_index = {}
+            # Inverted index from each title word to the rows containing it
+            self.token_index = defaultdict(list)
+            for i, title in enumerate(self.titles_lower.tolist()):
+                self.title_index.setdefault(title, i)
+                for token in set(re.findall(r'\w+', title)):
+                    self.token_index[token].append(i)
             
         except FileNotFoundError:
             QMessageBox.critical(self, "Error", 
@@ -131,6 +214,85 @@ class MovieRecommenderGUI(QMainWindow):
                                f"Error loading data: {str(e)}")
             sys.exit(1)
     
+    def process_dataset(self):
+        """Read the CSV file and compute the normalized TF-IDF matrix from scratch."""
+        # Step 1: Read only the needed columns of the CSV file, using pyarrow's
+        # multi-threaded reader and Arrow-backed strings when available
+        if pyarrow is not None:
+            self.df = pd.read_csv(DATASET_PATH, usecols=DATASET_COLUMNS,
+                                  engine='pyarrow', dtype_backend='pyarrow')
+        else:
+            self.df = pd.read_csv(DATASET_PATH, usecols=DATASET_COLUMNS)
+        
+        # Step 2: Select features for recommendation
+        features = ['keywords', 'cast', 'genres', 'director']
+        
+        # Step 3: Combine all selected features into a single string in one
+        # pass, treating missing values as empty strings
+        self.df["combined_features"] = self.df[features[0]].str.cat(
+            [self.df[feature] for feature in features[1:]], sep=" ", na_rep='')
+        
+        # Step 4: Create count matrix from combined features. Hashing tokens
+        # into a fixed feature space skips the vocabulary-building pass.
+        # float32 halves the memory read for every similarity row.
+        cv = HashingVectorizer(n_features=HASH_FEATURES, alternate_sign=False,
+                               norm=None, stop_words='english', dtype=np.float32)
+        count_matrix = cv.transform(self.df['combined_features'])
+        
+        # Drop tokens unique to one movie (they never add similarity to another
+        # movie) and cap the vocabulary, which shrinks the sparse matrix
+        doc_freq = np.bincount(count_matrix.indices, minlength=count_matrix.shape[1])
+        keep = np.flatnonzero(doc_freq >= MIN_DOC_FREQ)
+        if len(keep) > MAX_FEATURES:
+            keep = np.sort(keep[np.argsort(-doc_freq[keep], kind='stable')[:MAX_FEATURES]])
+        count_matrix = count_matrix[:, keep]
+        
+        # Step 5: Apply TF-IDF weighting so common tokens count for less, and
+        # L2-normalize rows so cosine similarity is a plain sparse dot product
+        tfidf = TfidfTransformer(norm='l2')
+        self.count_matrix = tfidf.fit_transform(count_matrix).tocsr()
+    
+    def load_cached_data(self, csv_mtime):
+        """
+        Load the count matrix and titles saved by a previous run.
+        Returns False when there is no cache or it was built from another CSV.
+        """
+        if not os.path.exists(CACHE_META_PATH):
+            return False
+        
+        try:
+            with open(CACHE_META_PATH) as f:
+                meta = json.load(f)
+            if meta.get('csv_mtime') != csv_mtime or meta.get('version') != CACHE_VERSION:
+                return False
+            
+            count_matrix = sp.load_npz(CACHE_MATRIX_PATH).tocsr()
+            titles = np.load(CACHE_TITLES_PATH)
+        except Exception as e:
+            # Any unreadable or corrupt cache file just means a rebuild
+            print(f"Ignoring data cache: {e}")
+            return False
+        
+        # Reject a matrix and title list saved by different runs
+        if len(titles) != count_matrix.shape[0]:
+            print("Ignoring data cache: matrix and titles do not match")
+            return False
+        
+        self.count_matrix = count_matrix
+        self.df = pd.DataFrame({'title': titles})
+        return True
+    
+    def save_cached_data(self, csv_mtime):
+        """Save the count matrix and titles so the next launch can skip processing."""
+        try:
+            sp.save_npz(CACHE_MATRIX_PATH, self.count_matrix)
+            np.save(CACHE_TITLES_PATH, self.df['title'].fillna('').astype(str).to_numpy(dtype=str))
+            # Written last so a partial save is never mistaken for a valid cache
+            with open(CACHE_META_PATH, 'w') as f:
+                json.dump({'csv_mtime': csv_mtime, 'version': CACHE_VERSION}, f)
+        except OSError as e:
+            print(f"Could not save data cache: {e}")
+    
     def init_ui(self):
         """Initialize and setup the user interface."""
         # Set window properties
@@ -248,6 +410,12 @@ class MovieRecommenderGUI(QMainWindow):
         self.recommendations_list.setAlternatingRowColors(True)
         main_layout.addWidget(self.recommendations_list, stretch=1)  # Stretch to fill available space
         
+        # Reusable list items, one per recommendation slot, hidden until filled
+        self._item_pool = [QListWidgetItem() for _ in range(TOP_N)]
+        for item in self._item_pool:
+            self.recommendations_list.addItem(item)
+            item.setHidden(True)
+        
         # Status label at the bottom
         self.status_label = QLabel("Ready")
         self.status_label.setStyleSheet("font-size: 10px; color: #95a5a6; padding-top: 5px;")
@@ -274,27 +442,47 @@ class MovieRecommenderGUI(QMainWindow):
                               "Please enter a movie title.")
             return
         
+        # Cancel the previous query so it cannot overwrite these results. This
+        # also covers a worker that has exited but whose results are still
+        # queued. A running thread is left to finish on its own rather than
+        # being terminated.
+        if self.worker:
+            self.worker.cancel()
+            if self.worker.isRunning():
+                self._stale_workers.append(self.worker)
+        self._stale_workers = [w for w in self._stale_workers if w.isRunning()]
+        
+        # Serve repeated queries straight from the cache
+        key = movie_title.lower()
+        self._pending_key = key
+        if key in self._rec_cache:
+            self._rec_cache.move_to_end(key)
+            self.display_recommendations(*self._rec_cache[key], None)
+            return
+        
         # Disable button and clear previous results
         self.recommend_button.setEnabled(False)
-        self.recommendations_list.clear()
+        self.clear_recommendations()
         self.status_label.setText("Searching for recommendations...")
         self.results_label.setText("Processing...")
         
         # Create and start worker thread
-        if self.worker and self.worker.isRunning():
-            self.worker.terminate()
-            self.worker.wait()
-        
-        self.worker = RecommendationWorker(movie_title, self.df, self.cosine_sim)
-        self.worker.finished.connect(self.display_recommendations)
-        self.worker.error.connect(self.handle_error)
+        self.worker = RecommendationWorker(movie_title, self.titles_arr, self.titles_lower,
+                                           self.count_matrix, self.title_index,
+                                           self.token_index)
+        self.worker.finished.connect(self.display_recommendations, Qt.QueuedConnection)
+        self.worker.error.connect(self.handle_error, Qt.QueuedConnection)
         self.worker.start()
     
-    def display_recommendations(self, recommendations, error):
+    def display_recommendations(self, recommendations, formatted, error):
         """
         Display the recommended movies in the list widget.
         Called when the worker thread finishes successfully.
         """
+        # Ignore results from a worker cancelled after it emitted them
+        if self.is_cancelled_sender():
+            return
+        
         self.recommend_button.setEnabled(True)
         
         if error:
@@ -306,22 +494,29 @@ class MovieRecommenderGUI(QMainWindow):
             self.status_label.setText("No results")
             return
         
-        # Clear the list
-        self.recommendations_list.clear()
+        # Repaint once after the whole batch rather than after every item
+        self.recommendations_list.setUpdatesEnabled(False)
+        try:
+            # Fill the pooled items in place and hide the unused ones
+            self.reset_list_view()
+            for i, item in enumerate(self._item_pool):
+                if i < len(recommendations):
+                    item.setText(formatted[i])
+                    # Set item properties for better display
+                    item.setData(Qt.UserRole, recommendations[i])
+                    item.setHidden(False)
+                else:
+                    item.setHidden(True)
+            self.recommendations_list.scrollToTop()
+        finally:
+            self.recommendations_list.setUpdatesEnabled(True)
         
-        # Add recommendations to the list
-        for idx, (title, score) in enumerate(recommendations, 1):
-            # Format similarity score as percentage
-            score_percent = f"{score * 100:.1f}%"
-            
-            # Create list item with formatted text
-            item_text = f"{idx}. {title} (Similarity: {score_percent})"
-            item = QListWidgetItem(item_text)
-            
-            # Set item properties for better display
-            item.setData(Qt.UserRole, (title, score))
-            
-            self.recommendations_list.addItem(item)
+        # Remember the results for repeated queries
+        if self._pending_key is not None:
+            self._rec_cache[self._pending_key] = (recommendations, formatted)
+            self._rec_cache.move_to_end(self._pending_key)
+            if len(self._rec_cache) > REC_CACHE_SIZE:
+                self._rec_cache.popitem(last=False)
         
         # Update labels
         self.results_label.setText(f"Found {len(recommendations)} recommendations")
@@ -332,6 +527,9 @@ class MovieRecommenderGUI(QMainWindow):
         Handle errors that occur during recommendation processing.
         Displays error message to the user.
         """
+        if self.is_cancelled_sender():
+            return
+        
         self.recommend_button.setEnabled(True)
         self.status_label.setText("Error occurred")
         
@@ -340,7 +538,24 @@ class MovieRecommenderGUI(QMainWindow):
         
         # Update UI labels
         self.results_label.setText("Error: " + error_message)
-        self.recommendations_list.clear()
+        self.clear_recommendations()
+    
+    def clear_recommendations(self):
+        """Hide every pooled list item without destroying it."""
+        self.reset_list_view()
+        for item in self._item_pool:
+            item.setHidden(True)
+    
+    def reset_list_view(self):
+        """Reset the selection, current item and scroll position, as clear() did."""
+        self.recommendations_list.clearSelection()
+        self.recommendations_list.setCurrentRow(-1)
+        self.recommendations_list.scrollToTop()
+    
+    def is_cancelled_sender(self):
+        """Return True if the current signal came from a cancelled worker."""
+        sender = self.sender()
+        return isinstance(sender, RecommendationWorker) and sender.is_cancelled()
     
     def resizeEvent(self, event):
         """